@@ -0,0 +1,107 @@
+import csv
+from typing import Tuple
+
+import numpy as np
+import pyarrow as pa
+from pyarrow import feather
+
+
+class DataWriter:
+    """
+    Helper class to persist the collected data. Can be used as a context manager.
+
+    All samples are stored in `data.feather`, the file is rewritten every `snapshot_interval` samples and when the writer is closed.
+    Optionally, every sample is also appended to `data.csv`, which keeps the original layout with tuples, e.g. `(1920, 1080)`.
+    """
+
+    COLUMNS = ['file_name', 'point_on_screen_x', 'point_on_screen_y', 'time_till_capture', 'monitor_mm_width', 'monitor_mm_height', 'monitor_pixels_width', 'monitor_pixels_height']
+    CSV_COLUMNS = ['file_name', 'point_on_screen', 'time_till_capture', 'monitor_mm', 'monitor_pixels']
+    NUMERIC_COLUMNS = {
+        'point_on_screen_x': np.int32,
+        'point_on_screen_y': np.int32,
+        'time_till_capture': np.float64,
+        'monitor_mm_width': np.int32,
+        'monitor_mm_height': np.int32,
+        'monitor_pixels_width': np.int32,
+        'monitor_pixels_height': np.int32,
+    }
+
+    def __init__(self, base_path: str, snapshot_interval: int = 10, write_csv: bool = False, initial_capacity: int = 256):
+        self.feather_path = f'{base_path}/data.feather'
+        self.snapshot_interval = snapshot_interval
+
+        # numeric columns are stored in one contiguous typed array each, which is enlarged when full
+        self.file_names = []
+        self.numeric_data = {column: np.empty(initial_capacity, dtype) for column, dtype in self.NUMERIC_COLUMNS.items()}
+        self.num_samples = 0
+
+        self.__csv_file = None
+        self.__csv_writer = None
+        if write_csv:
+            self.__csv_file = open(f'{base_path}/data.csv', 'w', newline='')
+            self.__csv_writer = csv.writer(self.__csv_file, lineterminator='\n')
+            self.__csv_writer.writerow([''] + self.CSV_COLUMNS)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def append(self, file_name: str, point_on_screen: Tuple[int, int], time_till_capture: float, monitor_mm: Tuple[int, int], monitor_pixels: Tuple[int, int]):
+        """
+        Add one sample and persist it.
+
+        :param file_name: file name of the webcam image
+        :param point_on_screen: position of the target on the screen in pixels
+        :param time_till_capture: time in seconds between the color change and the key press
+        :param monitor_mm: monitor dimensions in mm
+        :param monitor_pixels: monitor dimensions in pixels
+        """
+        if self.num_samples == len(self.numeric_data['time_till_capture']):
+            self.__grow()
+
+        idx = self.num_samples
+        row = [*point_on_screen, time_till_capture, *monitor_mm, *monitor_pixels]
+        self.file_names.append(file_name)
+        for column, value in zip(self.NUMERIC_COLUMNS, row):
+            self.numeric_data[column][idx] = value
+
+        if self.__csv_writer is not None:
+            self.__csv_writer.writerow([idx, file_name, tuple(point_on_screen), time_till_capture, tuple(monitor_mm), tuple(monitor_pixels)])
+            self.__csv_file.flush()  # keep data of already collected samples if the program crashes
+
+        self.num_samples += 1
+        if self.num_samples % self.snapshot_interval == 0:
+            self.save()
+
+    def __grow(self):
+        """
+        Double the capacity of the arrays.
+        """
+        for column, values in self.numeric_data.items():
+            self.numeric_data[column] = np.concatenate([values, np.empty_like(values)])
+
+    def to_table(self) -> pa.Table:
+        """
+        Get all collected samples. The numeric columns reference the arrays without copying them.
+
+        :return: collected samples with the columns `COLUMNS`
+        """
+        arrays = [pa.array(self.file_names, pa.string())]
+        arrays += [pa.array(self.numeric_data[column][:self.num_samples]) for column in self.NUMERIC_COLUMNS]
+        return pa.Table.from_arrays(arrays, names=self.COLUMNS)
+
+    def save(self):
+        """
+        Write all collected samples to the feather file.
+        """
+        if self.num_samples > 0:
+            feather.write_feather(self.to_table(), self.feather_path, compression='zstd')
+
+    def close(self):
+        self.save()
+        if self.__csv_file is not None:
+            self.__csv_file.close()
+            self.__csv_file = None
+            self.__csv_writer = None
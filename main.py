@@ -1,18 +1,38 @@
-import pathlib
+import os
 from argparse import ArgumentParser
-from collections import defaultdict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import List, Tuple
 
 import cv2
-import pandas as pd
 
-from utils import show_point_on_screen, get_monitor_dimensions
+from data_writer import DataWriter
+from utils import JPEG_QUALITY, show_point_on_screen, get_monitor_dimensions
 from webcam import WebcamSource
 
 WINDOW_NAME = 'data collection'
 
 
-def main(base_path: str, monitor_mm=None, monitor_pixels=None):
-    pathlib.Path(f'{base_path}/').mkdir(parents=True, exist_ok=True)
+def append_saved_samples(data_writer: DataWriter, pending_samples: List[Tuple[Future, tuple]], wait: bool = False):
+    """
+    Append the samples whose image was saved in the background, in the order they were collected.
+    Samples whose image could not be saved are dropped.
+
+    :param data_writer: writer to append the samples to
+    :param pending_samples: future of the saved image and the sample, appended samples are removed
+    :param wait: wait for all images to be saved, otherwise stop at the first image that is not saved yet
+    """
+    while pending_samples and (wait or pending_samples[0][0].done()):
+        image_saved, sample = pending_samples.pop(0)
+        try:
+            image_saved.result()
+        except (cv2.error, IOError) as error:
+            print(f'Dropped sample {sample[0]}, the image could not be saved: {error}')
+            continue
+        data_writer.append(*sample)
+
+
+def main(base_path: str, monitor_mm=None, monitor_pixels=None, write_csv=False, jpeg_quality=JPEG_QUALITY):
+    os.makedirs(base_path, exist_ok=True)
 
     source = WebcamSource()
     next(source)  # start webcam
@@ -23,35 +43,42 @@ def main(base_path: str, monitor_mm=None, monitor_pixels=None):
             raise ValueError('Please supply monitor dimensions manually as they could not be retrieved.')
     print(f'Found default monitor of size {monitor_mm[0]}x{monitor_mm[1]}mm and {monitor_pixels[0]}x{monitor_pixels[1]}px.')
 
-    cv2.namedWindow(WINDOW_NAME, cv2.WINDOW_NORMAL)
+    try:
+        cv2.namedWindow(WINDOW_NAME, cv2.WINDOW_OPENGL | cv2.WINDOW_NORMAL)
+        cv2.setWindowProperty(WINDOW_NAME, cv2.WND_PROP_VSYNC, 0)
+    except cv2.error:  # OpenCV was built without OpenGL support
+        cv2.namedWindow(WINDOW_NAME, cv2.WINDOW_NORMAL)
     cv2.setWindowProperty(WINDOW_NAME, cv2.WND_PROP_FULLSCREEN, cv2.WINDOW_FULLSCREEN)
 
-    collected_data = defaultdict(list)
-    while True:
-        file_name, center, time_till_capture = show_point_on_screen(WINDOW_NAME, base_path, monitor_pixels, source)
-        if file_name is not None and time_till_capture is not None:
-            collected_data['file_name'].append(file_name)
-            collected_data['point_on_screen'].append(center)
-            collected_data['time_till_capture'].append(time_till_capture)
-            collected_data['monitor_mm'].append(monitor_mm)
-            collected_data['monitor_pixels'].append(monitor_pixels)
-            pd.DataFrame(collected_data).to_csv(f'{base_path}/data.csv')
+    # the images are saved in a background thread, to not block the animation while encoding and writing them,
+    # samples are only appended once their image is saved
+    with ThreadPoolExecutor(max_workers=1) as image_writer, DataWriter(base_path, write_csv=write_csv) as data_writer:
+        pending_samples = []
+        try:
+            while True:
+                file_name, center, time_till_capture, image_saved = show_point_on_screen(WINDOW_NAME, base_path, monitor_pixels, source, image_writer, jpeg_quality)
+                if file_name is not None and time_till_capture is not None:
+                    pending_samples.append((image_saved, (file_name, center, time_till_capture, monitor_mm, monitor_pixels)))
+                append_saved_samples(data_writer, pending_samples)
 
-        if cv2.waitKey(500) & 0xFF == ord('q'):
-            cv2.destroyAllWindows()
-            break
+                if cv2.waitKey(500) & 0xFF == ord('q'):
+                    cv2.destroyAllWindows()
+                    break
+        finally:
+            append_saved_samples(data_writer, pending_samples, wait=True)
 
 
 if __name__ == '__main__':
     parser = ArgumentParser()
     parser.add_argument("--base_path", type=str, default='./data/p00')
-    parser.add_argument("--monitor_mm", type=str, default=None)
-    parser.add_argument("--monitor_pixels", type=str, default=None)
+    parser.add_argument("--monitor_mm", type=int, nargs=2, default=None, metavar=('WIDTH', 'HEIGHT'))
+    parser.add_argument("--monitor_pixels", type=int, nargs=2, default=None, metavar=('WIDTH', 'HEIGHT'))
+    parser.add_argument("--csv", action='store_true', help='additionally write the collected data to data.csv')
+    parser.add_argument("--jpeg_quality", type=int, default=JPEG_QUALITY, help='JPEG quality of the webcam images from 0 to 100')
     args = parser.parse_args()
 
-    if args.monitor_mm is not None:
-        args.monitor_mm = tuple(map(int, args.monitor_mm.split(',')))
-    if args.monitor_pixels is not None:
-        args.monitor_pixels = tuple(map(int, args.monitor_pixels.split(',')))
+    # tuples, as the monitor dimensions are used as cache keys
+    monitor_mm = tuple(args.monitor_mm) if args.monitor_mm is not None else None
+    monitor_pixels = tuple(args.monitor_pixels) if args.monitor_pixels is not None else None
 
-    main(args.base_path, args.monitor_mm, args.monitor_pixels)
+    main(args.base_path, monitor_mm, monitor_pixels, args.csv, args.jpeg_quality)
@@ -1,12 +1,14 @@
+import functools
 import random
 import sys
 import time
+from concurrent.futures import Executor, Future
 from datetime import datetime
 from enum import Enum
 
 import cv2
 import numpy as np
-from typing import Tuple, Union
+from typing import List, Optional, Tuple, Union
 
 from webcam import WebcamSource
 
@@ -47,6 +49,21 @@ FONT = cv2.FONT_HERSHEY_SIMPLEX
 TEXT_SCALE = 0.5
 TEXT_THICKNESS = 2
 
+FRAME_DURATION = 0.5  # seconds each frame of the target animation is shown
+KEY_POLL_INTERVAL = 0.001  # seconds to sleep between polling for pressed keys
+JPEG_QUALITY = 85
+
+
+@functools.lru_cache(maxsize=64)
+def get_text_size(target: str) -> Tuple[Tuple[int, int], int]:
+    """
+    Get the size of the target when written with the default font, it is only computed once per target.
+
+    :param target: char to write
+    :return: width and height of the text and the baseline
+    """
+    return cv2.getTextSize(target, FONT, TEXT_SCALE, TEXT_THICKNESS)
+
 
 class TargetOrientation(Enum):
     UP = 82
@@ -55,47 +72,102 @@ class TargetOrientation(Enum):
     RIGHT = 83
 
 
-def create_image(monitor_pixels: Tuple[int, int], center=(0, 0), circle_scale=1., orientation=TargetOrientation.RIGHT, target='E') -> Tuple[np.ndarray, float, bool]:
+@functools.lru_cache(maxsize=1)
+def get_black_image(monitor_pixels: Tuple[int, int]) -> np.ndarray:
+    """
+    Get a black image in the size of the monitor, it is only allocated once. The returned image must not be modified.
+
+    :param monitor_pixels: monitor dimensions in pixels
+    :return: black image
+    """
+    return np.zeros((monitor_pixels[1], monitor_pixels[0], 3), np.uint8)
+
+
+class TargetCanvas:
+    """
+    Image the animation of a target is drawn on. The image is reused for every frame and every target,
+    only the region drawn on in the previous frame is cleared.
+    """
+
+    def __init__(self, monitor_pixels: Tuple[int, int]):
+        self.image = np.zeros((monitor_pixels[1], monitor_pixels[0], 3), np.uint8)
+
+        self.last_bbox = None
+
+    def clear(self):
+        """
+        Clear the region drawn on in the previous frame.
+        """
+        if self.last_bbox is not None:
+            cv2.rectangle(self.image, self.last_bbox[0], self.last_bbox[1], (0, 0, 0), -1)
+            self.last_bbox = None
+
+    def paste(self, patch: np.ndarray, center: Tuple[int, int]):
+        """
+        Copy a square patch onto the image, parts outside of the image are cut off.
+
+        :param patch: square patch with an odd side length
+        :param center: position of the center of the patch on the image
+        """
+        height, width = self.image.shape[:2]
+        size = patch.shape[0]
+        x0, y0 = center[0] - size // 2, center[1] - size // 2
+        x1, y1 = x0 + size, y0 + size
+
+        self.image[max(y0, 0):min(y1, height), max(x0, 0):min(x1, width)] = patch[max(-y0, 0):size - max(y1 - height, 0), max(-x0, 0):size - max(x1 - width, 0)]
+        self.last_bbox = ((x0, y0), (x1 - 1, y1 - 1))
+
+
+@functools.lru_cache(maxsize=1)
+def get_target_canvas(monitor_pixels: Tuple[int, int]) -> TargetCanvas:
+    """
+    Get the canvas to draw the targets on, it is only allocated once.
+
+    :param monitor_pixels: monitor dimensions in pixels
+    :return: canvas
+    """
+    return TargetCanvas(monitor_pixels)
+
+
+def create_image(monitor_pixels: Tuple[int, int], center=(0, 0), circle_scale=1., is_horizontal=True, flip=False, target='E', canvas: TargetCanvas = None, end_threshold: float = None) -> Tuple[np.ndarray, float, bool]:
     """
     Create image to display on screen.
 
     :param monitor_pixels: monitor dimensions in pixels
     :param center: center of the circle and the text
     :param circle_scale: scale of the circle
-    :param orientation: orientation of the target
+    :param is_horizontal: True if the target points to the left or right, otherwise it points up or down
+    :param flip: True if the target points to the left or up
     :param target: char to write on image
+    :param canvas: canvas of the previous frame of the same target, a new one is created if None
+    :param end_threshold: circle_scale at which the animation ends, a random one is used if None
     :return: created image, new smaller circle_scale and bool that indicated if it is th last frame in the animation
     """
-    width, height = monitor_pixels
-
-    if orientation == TargetOrientation.LEFT or orientation == TargetOrientation.RIGHT:
-        img = np.zeros((height, width, 3), np.float32)
-
-        if orientation == TargetOrientation.LEFT:
-            center = (width - center[0], center[1])
+    if canvas is None:
+        canvas = TargetCanvas(monitor_pixels)
+    if end_threshold is None:
+        end_threshold = get_random_end_threshold()
 
-        end_animation_loop = write_text_on_image(center, circle_scale, img, target)
+    canvas.clear()
 
-        if orientation == TargetOrientation.LEFT:
-            img = cv2.flip(img, 1)
-    else:  # TargetOrientation.UP or TargetOrientation.DOWN
-        img = np.zeros((width, height, 3), np.float32)
-        center = (center[1], center[0])
+    # draw the target on a small patch around the center and only rotate the patch, the circle is symmetric to the center of the patch
+    text_size, baseline = get_text_size(target)
+    half_size = max(int(text_size[0] * 5 * circle_scale), text_size[0], text_size[1] + baseline) + TEXT_THICKNESS
+    patch = np.zeros((2 * half_size + 1, 2 * half_size + 1, 3), np.uint8)
 
-        if orientation == TargetOrientation.UP:
-            center = (height - center[0], center[1])
+    end_animation_loop = write_text_on_image((half_size, half_size), circle_scale, patch, target, end_threshold)
 
-        end_animation_loop = write_text_on_image(center, circle_scale, img, target)
+    if flip:
+        patch = cv2.flip(patch, 1)
+    if not is_horizontal:
+        patch = patch.transpose((1, 0, 2))
 
-        if orientation == TargetOrientation.UP:
-            img = cv2.flip(img, 1)
+    canvas.paste(patch, center)
 
-        img = img.transpose((1, 0, 2))
+    return canvas.image, circle_scale * 0.9, end_animation_loop
 
-    return img / 255, circle_scale * 0.9, end_animation_loop
 
-
-def write_text_on_image(center: Tuple[int, int], circle_scale: float, img: np.ndarray, target: str):
+def write_text_on_image(center: Tuple[int, int], circle_scale: float, img: np.ndarray, target: str, end_threshold: float) -> bool:
     """
     Write target on image and check if last frame of the animation.
 
@@ -103,13 +175,14 @@ def write_text_on_image(center: Tuple[int, int], circle_scale: float, img: np.nd
     :param circle_scale: scale of the circle
     :param img: image to write data on
     :param target: char to write
+    :param end_threshold: circle_scale at which the animation ends
     :return: True if last frame of the animation
     """
-    text_size, _ = cv2.getTextSize(target, FONT, TEXT_SCALE, TEXT_THICKNESS)
+    text_size, _ = get_text_size(target)
     cv2.circle(img, center, int(text_size[0] * 5 * circle_scale), (32, 32, 32), -1)
     text_origin = (center[0] - text_size[0] // 2, center[1] + text_size[1] // 2)
 
-    end_animation_loop = circle_scale < random.uniform(0.1, 0.5)
+    end_animation_loop = circle_scale < end_threshold
     if not end_animation_loop:
         cv2.putText(img, target, text_origin, FONT, TEXT_SCALE, (17, 112, 170), TEXT_THICKNESS, cv2.LINE_AA)
     else:
@@ -118,6 +191,15 @@ def write_text_on_image(center: Tuple[int, int], circle_scale: float, img: np.nd
     return end_animation_loop
 
 
+def get_random_end_threshold() -> float:
+    """
+    Get random circle_scale at which the animation of a target ends.
+
+    :return: random circle_scale between 0.1 and 0.5
+    """
+    return random.uniform(0.1, 0.5)
+
+
 def get_random_position_on_screen(monitor_pixels: Tuple[int, int]) -> Tuple[int, int]:
     """
     Get random valid position on monitor.
@@ -128,7 +210,20 @@ def get_random_position_on_screen(monitor_pixels: Tuple[int, int]) -> Tuple[int,
     return int(random.uniform(0, 1) * monitor_pixels[0]), int(random.uniform(0, 1) * monitor_pixels[1])
 
 
-def show_point_on_screen(window_name: str, base_path: str, monitor_pixels: Tuple[int, int], source: WebcamSource) -> Tuple[str, Tuple[int, int], float]:
+def save_image(image_path: str, image: np.ndarray, params: List[int]):
+    """
+    Save image to disk.
+
+    :param image_path: path to save the image to
+    :param image: image to save
+    :param params: encoding parameters passed to cv2.imwrite
+    :raises IOError: if OpenCV could not save the image
+    """
+    if not cv2.imwrite(image_path, image, params):
+        raise IOError(f'Could not save image to {image_path}.')
+
+
+def show_point_on_screen(window_name: str, base_path: str, monitor_pixels: Tuple[int, int], source: WebcamSource, image_writer: Optional[Executor] = None, jpeg_quality: int = JPEG_QUALITY, frame_duration: float = FRAME_DURATION) -> Tuple[str, Tuple[int, int], float, Optional[Future]]:
     """
     Show one target on screen, full animation cycle. Return collected data if data is valid
 
@@ -136,37 +231,57 @@ def show_point_on_screen(window_name: str, base_path: str, monitor_pixels: Tuple
     :param base_path: path where to save the image to
     :param monitor_pixels: monitor dimensions in pixels
     :param source: webcam source
-    :return: collected data otherwise None
+    :param image_writer: executor to save the image in the background, the image is saved directly if None
+    :param jpeg_quality: JPEG quality of the saved image from 0 to 100
+    :param frame_duration: duration in seconds each frame of the animation is shown
+    :return: collected data otherwise None and the future of the image saved in the background, None if not saved by `image_writer`
     """
     circle_scale = 1.
     center = get_random_position_on_screen(monitor_pixels)
     end_animation_loop = False
     orientation = random.choice(list(TargetOrientation))
+    is_horizontal = orientation in (TargetOrientation.LEFT, TargetOrientation.RIGHT)
+    flip = orientation in (TargetOrientation.LEFT, TargetOrientation.UP)
+    orientation_key = orientation.value
+
+    canvas = get_target_canvas(monitor_pixels)
+    canvas.clear()
+    end_threshold = get_random_end_threshold()
 
     file_name = None
     time_till_capture = None
+    image_saved = None
 
     while not end_animation_loop:
-        image, circle_scale, end_animation_loop = create_image(monitor_pixels, center, circle_scale, orientation)
+        image, circle_scale, end_animation_loop = create_image(monitor_pixels, center, circle_scale, is_horizontal, flip, canvas=canvas, end_threshold=end_threshold)
         cv2.imshow(window_name, image)
 
-        for _ in range(10):  # workaround to not speed up the animation when buttons are pressed
-            if cv2.waitKey(50) & 0xFF == ord('q'):
+        end_time_frame = time.perf_counter() + frame_duration
+        while time.perf_counter() < end_time_frame:  # wait for the full duration to not speed up the animation when buttons are pressed
+            if cv2.pollKey() & 0xFF == ord('q'):
                 cv2.destroyAllWindows()
                 sys.exit()
+            time.sleep(KEY_POLL_INTERVAL)
 
     if end_animation_loop:
-        file_name = datetime.now().strftime("%Y_%m_%d-%H_%M_%S")
-        start_time_color_change = time.time()
+        file_name = datetime.now().strftime("%Y_%m_%d-%H_%M_%S.jpg")
+        image_path = f'{base_path}/{file_name}'
+        jpeg_params = [cv2.IMWRITE_JPEG_QUALITY, jpeg_quality, cv2.IMWRITE_JPEG_OPTIMIZE, 0, cv2.IMWRITE_JPEG_PROGRESSIVE, 0]
+        start_time_color_change = time.perf_counter()
 
-        while time.time() - start_time_color_change < 0.5:
-            if cv2.waitKey(42) & 0xFF == orientation.value:
+        while time.perf_counter() - start_time_color_change < 0.5:
+            if cv2.pollKey() & 0xFF == orientation_key:
                 source.clear_frame_buffer()
-                cv2.imwrite(f'{base_path}/{file_name}.jpg', next(source))
-                time_till_capture = time.time() - start_time_color_change
+                frame = next(source)
+                time_till_capture = time.perf_counter() - start_time_color_change
+                if image_writer is not None:
+                    image_saved = image_writer.submit(save_image, image_path, frame, jpeg_params)
+                else:
+                    save_image(image_path, frame, jpeg_params)
                 break
+            time.sleep(KEY_POLL_INTERVAL)
 
-    cv2.imshow(window_name, np.zeros((monitor_pixels[1], monitor_pixels[0], 3), np.float32))
+    cv2.imshow(window_name, get_black_image(monitor_pixels))
     cv2.waitKey(500)
 
-    return f'{file_name}.jpg', center, time_till_capture
+    return file_name, center, time_till_capture, image_saved
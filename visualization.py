@@ -1,3 +1,4 @@
+import os
 from argparse import ArgumentParser
 from typing import Tuple
 
@@ -571,6 +572,39 @@ def plot_eye_to_target_on_screen_line(ax, face_model_all_transformed, point_on_s
     ax.plot([point_on_screen_3d[0], eye_center[0]], [point_on_screen_3d[1], eye_center[1]], [point_on_screen_3d[2], eye_center[2]], color='#d62728', label='left eye gaze vector')
 
 
+def read_collected_data(base_path: str) -> pd.DataFrame:
+    """
+    Read the collected data from `data.feather`, fall back to `data.csv` for older recordings.
+    Columns of older recordings that store tuples are split into one column per value.
+
+    :param base_path: path where the collected data is stored
+    :return: collected data
+    """
+    if os.path.isfile(f'{base_path}/data.feather'):
+        df = pd.read_feather(f'{base_path}/data.feather')
+    else:
+        df = pd.read_csv(f'{base_path}/data.csv')
+
+    for column, suffixes in [('point_on_screen', ('x', 'y')), ('monitor_mm', ('width', 'height')), ('monitor_pixels', ('width', 'height'))]:
+        if column in df.columns:
+            values = df.pop(column).map(to_int_tuple)
+            for idx, suffix in enumerate(suffixes):
+                df[f'{column}_{suffix}'] = values.map(lambda value: value[idx])
+    return df
+
+
+def to_int_tuple(value) -> Tuple[int, ...]:
+    """
+    Convert a tuple stored in older recordings to a tuple of ints.
+
+    :param value: tuple as string, e.g. '(1920, 1080)', when read from CSV, otherwise a sequence
+    :return: tuple of ints
+    """
+    if isinstance(value, str):
+        value = value[1:-1].split(',')
+    return tuple(map(int, value))
+
+
 def main(base_path: str, screen_height_mm_offset: int = 10):
     fix_qt_cv_mismatch()
 
@@ -578,11 +612,11 @@ def main(base_path: str, screen_height_mm_offset: int = 10):
 
     face_mesh = mp.solutions.face_mesh.FaceMesh(static_image_mode=True)
 
-    df = pd.read_csv(f'{base_path}/data.csv')
+    df = read_collected_data(base_path)
     for idx, row in df.iterrows():
-        monitor_mm = tuple(map(int, row['monitor_mm'][1:-1].split(',')))
-        monitor_pixels = tuple(map(int, row['monitor_pixels'][1:-1].split(',')))
-        point_on_screen_px = tuple(map(int, row['point_on_screen'][1:-1].split(',')))
+        monitor_mm = (row['monitor_mm_width'], row['monitor_mm_height'])
+        monitor_pixels = (row['monitor_pixels_width'], row['monitor_pixels_height'])
+        point_on_screen_px = (row['point_on_screen_x'], row['point_on_screen_y'])
 
         fig, ax = setup_figure()
         plot_screen(ax, monitor_mm[0], monitor_mm[1], screen_height_mm_offset)
@@ -44,7 +44,8 @@ class WebcamSource:
         if cv2.waitKey(1) & 0xFF == ord('q'):
             raise StopIteration
 
-        return frame
+        # no-op for frames read by VideoCapture, avoids hidden copies in imwrite if a strided view is ever returned
+        return np.ascontiguousarray(frame)
 
     def clear_frame_buffer(self):
         for _ in range(self.buffer_size):